@@ -1,9 +1,14 @@
 
 import os
 import sys
+import errno
 import asyncio
 import logging
+import random
 import socket
+import threading
+import time
+from typing import Dict, Tuple
 from network.tor_manager import TorManager
 from network.mesh import MeshNetwork
 from ui.chat_window import ChatWindow
@@ -25,14 +30,43 @@ class MeshChat:
         self.crypto = CryptoManager()
         self.secure_memory = SecureMemory()
 
+        # Health check cache: (host, port) -> (timestamp, result)
+        # Only successful probes are cached so startup retries re-probe
+        self._hc_cache: Dict[Tuple[str, int], Tuple[float, bool]] = {}
+        self._hc_ttl = 10.0
+
     async def _verify_network(self) -> bool:
         """Verify network components are running"""
+        key = ('127.0.0.1', 12345)
+        cached = self._hc_cache.get(key)
+        if cached and time.monotonic() - cached[0] < self._hc_ttl:
+            return cached[1]
+
         try:
-            # Try connecting to health check endpoint
-            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            sock.connect(('127.0.0.1', 12345))
-            sock.close()
+            family, socktype, proto, _, sockaddr = socket.getaddrinfo(
+                key[0], key[1], type=socket.SOCK_STREAM
+            )[0]
+            sock = socket.socket(family, socktype, proto)
+            try:
+                if os.name == 'posix':
+                    # Bind-probe instead of a full TCP handshake: if the
+                    # port is already taken, the health check listener is up
+                    try:
+                        sock.bind(sockaddr)
+                    except OSError as e:
+                        if e.errno != errno.EADDRINUSE:
+                            raise
+                    else:
+                        raise ConnectionError(f"Nothing listening on {key[0]}:{key[1]}")
+                else:
+                    # Windows lets a specific-address bind shadow a wildcard
+                    # listener, so only a connect proves it is up
+                    sock.settimeout(1.0)
+                    sock.connect(sockaddr)
+            finally:
+                sock.close()
             self.logger.info("Network connectivity verified")
+            self._hc_cache[key] = (time.monotonic(), True)
             return True
         except Exception as e:
             self.logger.error(f"Network verification failed: {str(e)}")
@@ -40,6 +74,10 @@ class MeshChat:
 
     async def start(self):
         """Start application with robust error handling"""
+        # Let tasks that finish without blocking complete eagerly (Python 3.12+)
+        if hasattr(asyncio, 'eager_task_factory'):
+            asyncio.get_running_loop().set_task_factory(asyncio.eager_task_factory)
+
         try:
             # Start Tor
             self.logger.info("Starting Tor...")
@@ -49,6 +87,7 @@ class MeshChat:
             # Initialize mesh network with retries
             max_retries = 3
             retry_delay = 2
+            max_retry_delay = 60
             last_error = None
 
             for attempt in range(max_retries):
@@ -67,7 +106,9 @@ class MeshChat:
                     last_error = e
                     self.logger.warning(f"Attempt {attempt + 1} failed: {str(e)}")
                     if attempt < max_retries - 1:
-                        await asyncio.sleep(retry_delay)
+                        # Exponential backoff with +/-25% jitter
+                        delay = min(max_retry_delay, retry_delay * (2 ** attempt))
+                        await asyncio.sleep(delay * random.uniform(0.75, 1.25))
                     else:
                         raise Exception(f"Failed to start mesh network after {max_retries} attempts: {str(last_error)}")
 
@@ -77,16 +118,64 @@ class MeshChat:
                 self.mesh_network,
                 self.tor_manager,
                 self.crypto,
-                self.secure_memory
+                self.secure_memory,
+                asyncio.get_running_loop()
             )
 
             self.logger.info("Application fully started")
-            await self.window.run()
 
         except Exception as e:
             self.logger.error(f"Fatal error: {str(e)}")
-            await self.cleanup()
-            sys.exit(1)
+            raise
+
+    def run(self):
+        """Run asyncio on a background thread and the GUI on the main thread"""
+        loop = asyncio.new_event_loop()
+        loop_thread = threading.Thread(target=loop.run_forever, daemon=True)
+        loop_thread.start()
+
+        exit_code = 0
+        try:
+            try:
+                asyncio.run_coroutine_threadsafe(self.start(), loop).result()
+            except Exception:
+                exit_code = 1  # Already logged by start()
+            else:
+                # Tk's mainloop owns the main thread until the window closes
+                self.window.run()
+        except KeyboardInterrupt:
+            self.logger.info("Received shutdown signal")
+        except Exception as e:
+            self.logger.exception(f"Fatal error: {str(e)}")
+            exit_code = 1
+        finally:
+            try:
+                asyncio.run_coroutine_threadsafe(self.cleanup(), loop).result(timeout=30)
+            except Exception as e:
+                self.logger.error(f"Cleanup did not complete: {str(e)}")
+            try:
+                asyncio.run_coroutine_threadsafe(self._drain_loop(), loop).result(timeout=5)
+            except Exception as e:
+                self.logger.error(f"Event loop shutdown did not complete: {str(e)}")
+            loop.call_soon_threadsafe(loop.stop)
+            loop_thread.join(timeout=5)
+            if not loop.is_running():
+                loop.close()
+
+        if exit_code:
+            sys.exit(exit_code)
+
+    async def _drain_loop(self):
+        """Cancel leftover tasks and finalize the loop, as asyncio.run() does"""
+        current = asyncio.current_task()
+        tasks = [task for task in asyncio.all_tasks() if task is not current]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+        loop = asyncio.get_running_loop()
+        await loop.shutdown_asyncgens()
+        await loop.shutdown_default_executor()
 
     async def cleanup(self):
         """Cleanup with proper error handling"""
@@ -96,26 +185,33 @@ class MeshChat:
 
         # Stop Tor
         if hasattr(self, 'tor_manager'):
-            cleanup_tasks.append(self.tor_manager.stop())
+            cleanup_tasks.append(asyncio.create_task(self.tor_manager.stop()))
 
         # Stop mesh network
         if hasattr(self, 'mesh_network'):
-            cleanup_tasks.append(self.mesh_network.stop())
+            cleanup_tasks.append(asyncio.create_task(self.mesh_network.stop()))
 
         # Wipe sensitive data
         if hasattr(self, 'secure_memory'):
             self.secure_memory.wipe_all()
 
-        # Wait for all cleanup tasks
+        # Wait for all cleanup tasks, bounded so one stalled path can't hang shutdown
         if cleanup_tasks:
-            await asyncio.gather(*cleanup_tasks, return_exceptions=True)
+            done, pending = await asyncio.wait(
+                cleanup_tasks,
+                timeout=10,
+                return_when=asyncio.FIRST_EXCEPTION
+            )
+            for task in done:
+                if not task.cancelled() and task.exception():
+                    self.logger.error(f"Cleanup task failed: {str(task.exception())}")
+            if pending:
+                self.logger.warning(f"Cancelling {len(pending)} unfinished cleanup task(s)")
+                for task in pending:
+                    task.cancel()
+                await asyncio.wait(pending)
 
         self.logger.info("Cleanup completed")
 
 if __name__ == "__main__":
-    app = MeshChat()
-    try:
-        asyncio.run(app.start())
-    except KeyboardInterrupt:
-        app.logger.info("Received shutdown signal")
-        asyncio.run(app.cleanup())
+    MeshChat().run()
@@ -1,16 +1,35 @@
 import asyncio
+import hashlib
+import os
 from kademlia.network import Server
+import random
 import socket
 import zstandard as zstd
-from typing import List, Dict, Optional, Set
+from typing import List, Dict, Optional, Tuple
 import time
 import logging
+from collections import OrderedDict
 from dataclasses import dataclass
 from contextlib import asynccontextmanager
 from aiohttp import web
 import threading
 
-@dataclass
+# Optional shared zstd dictionary for short chat messages. zstd frames record
+# the dictionary ID, so peers without it can still decode dictionary-less frames.
+ZSTD_DICT_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "dictionaries", "chat.zdict"
+)
+
+def _make_socket() -> socket.socket:
+    """Create a TCP socket that can rebind ports still in TIME_WAIT"""
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    # Same policy as asyncio: on Windows SO_REUSEADDR lets another socket
+    # steal a port that is actively bound, so only enable it on POSIX
+    if os.name == 'posix':
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    return sock
+
+@dataclass(slots=True)
 class PeerState:
     last_seen: float
     failed_attempts: int = 0
@@ -23,13 +42,48 @@ class MeshNetwork:
         self.port: Optional[int] = None
         self.dht = Server()
         self.peers: Dict[str, PeerState] = {}
+        # Set whenever peers are added or removed
+        self.peers_changed = asyncio.Event()
         self.message_buffer: List[Dict] = []
+        # Decoded incoming chat messages, consumed by the UI
+        self.inbox: "asyncio.Queue[str]" = asyncio.Queue()
         self.is_running = False
-        self.known_messages: Set[str] = set()
+        # Background maintenance tasks, cancelled on stop
+        self._tasks: List[asyncio.Task] = []
+        # LRU of 16-byte BLAKE2b message digests used for deduplication
+        self.known_messages: "OrderedDict[bytes, None]" = OrderedDict()
+        self.max_known_messages = 65536
         self.retry_interval = 30
         self.peer_timeout = 300
         self.logger = logging.getLogger('MeshNetwork')
         self._http_runner = None
+        # Health check cache: (host, port) -> (timestamp, result)
+        self._hc_cache: Dict[Tuple[str, int], Tuple[float, bool]] = {}
+        self._hc_ttl = 10.0
+        # Periodic DHT re-bootstrap to keep the routing table populated
+        self.dht_refresh_interval = 600
+        # Peer address resolution cache: peer -> (timestamp, [(family, sockaddr)])
+        self._resolve_cache: Dict[str, Tuple[float, List[Tuple[int, tuple]]]] = {}
+        self.resolve_ttl = 900
+        # Keep-alive connection pool: peer -> (reader, writer, last_used)
+        self._conn_pool: "OrderedDict[str, Tuple[asyncio.StreamReader, asyncio.StreamWriter, float]]" = OrderedDict()
+        self.max_pooled_connections = 64
+        self.conn_idle_timeout = 120
+        # Reusable zstd contexts; building one per message dominates small sends
+        self._zstd_dict = self._load_zstd_dict()
+        self._zstd_c = zstd.ZstdCompressor(level=3, dict_data=self._zstd_dict)  # Balanced compression
+        self._zstd_d = zstd.ZstdDecompressor(dict_data=self._zstd_dict)
+
+    def _load_zstd_dict(self) -> Optional[zstd.ZstdCompressionDict]:
+        """Load the shared chat compression dictionary if installed"""
+        try:
+            with open(ZSTD_DICT_PATH, 'rb') as f:
+                return zstd.ZstdCompressionDict(f.read())
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            self.logger.warning(f"Could not load compression dictionary: {str(e)}")
+            return None
 
     async def _start_http_server(self):
         """Start minimal HTTP server for health checks"""
@@ -57,6 +111,7 @@ class MeshNetwork:
     async def _verify_port_active(self, port: int, timeout: int = 5) -> bool:
         """Wait for port to become active with shorter timeout"""
         end_time = time.time() + timeout
+        attempt = 0
         while time.time() < end_time:
             try:
                 # Use the DHT's bootstrap functionality to verify
@@ -65,15 +120,17 @@ class MeshNetwork:
                 return True
             except Exception as e:
                 self.logger.debug(f"Port verification attempt failed: {str(e)}")
-                await asyncio.sleep(0.5)
+                # Exponential backoff with +/-25% jitter, capped at 2s
+                delay = min(2, 0.5 * (2 ** attempt))
+                await asyncio.sleep(delay * random.uniform(0.75, 1.25))
+                attempt += 1
         self.logger.error(f"❌ Port {port} did not become active within {timeout} seconds")
         return False
 
     async def _cleanup_port(self, port: int):
         """Cleanup a port before trying to use it"""
         try:
-            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            sock = _make_socket()
             sock.bind(('0.0.0.0', port))
             sock.close()
         except Exception as e:
@@ -101,9 +158,12 @@ class MeshNetwork:
                 self.is_running = True
 
                 # Start maintenance tasks
-                asyncio.create_task(self._peer_maintenance())
-                asyncio.create_task(self._handle_message_buffer())
-                asyncio.create_task(self._heartbeat())
+                self._tasks = [
+                    asyncio.create_task(self._peer_maintenance()),
+                    asyncio.create_task(self._handle_message_buffer()),
+                    asyncio.create_task(self._heartbeat()),
+                    asyncio.create_task(self._reap_idle_connections())
+                ]
 
                 # Short wait before verification
                 await asyncio.sleep(1)
@@ -111,15 +171,17 @@ class MeshNetwork:
                 # Verify DHT is listening
                 if await self._verify_port_active(test_port):
                     self.logger.info(f"✅ DHT started successfully on port {test_port}")
+                    self._tasks.append(asyncio.create_task(self._dht_refresh()))
                     return
                 else:
                     raise RuntimeError(f"DHT failed to bind to port {test_port}")
 
             except Exception as e:
                 self.logger.error(f"❌ Failed to start on port {test_port}: {str(e)}")
+                await self._cancel_tasks()
                 if self.dht:
                     try:
-                        await self.dht.stop()
+                        self.dht.stop()
                     except:
                         pass
                 self.is_running = False
@@ -132,37 +194,77 @@ class MeshNetwork:
         self.logger.info("Stopping mesh network")
         self.is_running = False
 
+        # Stop maintenance tasks instead of waiting for their next wakeup
+        await self._cancel_tasks()
+
+        stop_tasks = []
+
         # Stop HTTP server
         if self._http_runner:
-            await self._http_runner.cleanup()
+            stop_tasks.append(asyncio.create_task(self._http_runner.cleanup()))
             self._http_runner = None
 
-        # Stop DHT
+        # Close pooled peer connections
+        if self._conn_pool:
+            stop_tasks.append(asyncio.create_task(self._close_pooled_connections()))
+
+        # Stop DHT (kademlia's Server.stop() is synchronous)
         if self.dht:
-            await self.dht.stop()
+            self.dht.stop()
+
+        # Bound shutdown time; cancel whatever is left on error or timeout
+        if stop_tasks:
+            done, pending = await asyncio.wait(
+                stop_tasks,
+                timeout=10,
+                return_when=asyncio.FIRST_EXCEPTION
+            )
+            for task in done:
+                if not task.cancelled() and task.exception():
+                    self.logger.error(f"❌ Shutdown step failed: {str(task.exception())}")
+            if pending:
+                self.logger.warning(f"⚠️ Cancelling {len(pending)} unfinished shutdown task(s)")
+                for task in pending:
+                    task.cancel()
+                await asyncio.wait(pending)
 
         await asyncio.sleep(1)  # Allow tasks to complete
         self.logger.info("Mesh network stopped")
 
+    async def _cancel_tasks(self) -> None:
+        """Cancel the background maintenance tasks and wait for them"""
+        tasks, self._tasks = self._tasks, []
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
     async def broadcast_message(self, message: str) -> None:
         """Broadcast message to all peers with deduplication"""
-        msg_hash = hash(message)
+        msg_hash = hashlib.blake2b(message.encode(), digest_size=16).digest()
         if msg_hash in self.known_messages:
+            self.known_messages.move_to_end(msg_hash)
             return
 
-        self.known_messages.add(msg_hash)
+        self.known_messages[msg_hash] = None
+        if len(self.known_messages) > self.max_known_messages:
+            self.known_messages.popitem(last=False)
         compressed = self._compress_message(message)
 
-        failed_peers = []
-        for peer, state in self.peers.items():
-            if not state.is_active:
-                continue
+        # Fan out to all active peers concurrently
+        active_peers = [
+            (peer, state) for peer, state in self.peers.items()
+            if state.is_active
+        ]
+        sends = [
+            asyncio.create_task(self._send_to_peer(peer, compressed))
+            for peer, _ in active_peers
+        ]
+        results = await asyncio.gather(*sends, return_exceptions=True)
 
-            try:
-                async with self._peer_connection(peer) as conn:
-                    await self._send_message(conn, compressed)
-            except Exception as e:
-                self.logger.warning(f"Failed to send to {peer}: {str(e)}")
+        failed_peers = []
+        for (peer, state), result in zip(active_peers, results):
+            if isinstance(result, Exception):
+                self.logger.warning(f"Failed to send to {peer}: {str(result)}")
                 state.failed_attempts += 1
                 if state.failed_attempts >= 3:
                     state.is_active = False
@@ -179,35 +281,158 @@ class MeshNetwork:
 
     @asynccontextmanager
     async def _peer_connection(self, peer: str):
-        """Context manager for peer connections with timeout"""
-        reader, writer = await asyncio.wait_for(
-            asyncio.open_connection(peer, self.port),
-            timeout=10
-        )
+        """Context manager for pooled keep-alive peer connections"""
+        entry = self._conn_pool.get(peer)
+        if entry and not self._is_connection_usable(entry):
+            # Peer closed its end; writes would vanish without an error
+            await self._evict_connection(peer, entry[1])
+            entry = None
+        if entry:
+            reader, writer, _ = entry
+        else:
+            try:
+                reader, writer = await asyncio.wait_for(
+                    self._open_peer_stream(peer),
+                    timeout=10
+                )
+            except Exception:
+                # Address may have changed; resolve again next time
+                self._resolve_cache.pop(peer, None)
+                raise
+            # Chat frames are small and latency-sensitive; disable Nagle
+            sock = writer.get_extra_info('socket')
+            if sock is not None:
+                sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            # Another send may have pooled a connection while we were opening
+            existing = self._conn_pool.get(peer)
+            if existing and self._is_connection_usable(existing):
+                writer.close()
+                reader, writer, _ = existing
+        self._pool_connection(peer, reader, writer)
+
         try:
             yield (reader, writer)
-        finally:
-            writer.close()
+        except Exception:
+            # Connection is suspect; drop it so the next send reconnects
+            await self._evict_connection(peer, writer)
+            raise
+        else:
+            if peer in self._conn_pool:
+                self._pool_connection(peer, reader, writer)
+
+    async def _open_peer_stream(self, peer: str):
+        """Open a stream to a peer, trying each cached resolved address"""
+        if peer.endswith('.onion'):
+            # Resolution happens inside Tor
+            return await asyncio.open_connection(peer, self.port)
+
+        loop = asyncio.get_running_loop()
+        addresses = await self._resolve_peer(peer)
+        last_error: Optional[Exception] = None
+        for family, sockaddr in addresses:
+            sock = socket.socket(family, socket.SOCK_STREAM)
+            sock.setblocking(False)
+            try:
+                # Connect on the raw sockaddr to keep IPv6 scope IDs
+                await loop.sock_connect(sock, sockaddr)
+            except OSError as e:
+                sock.close()
+                last_error = e
+                continue
+            # Try the address that worked first next time
+            if addresses[0] != (family, sockaddr):
+                addresses.remove((family, sockaddr))
+                addresses.insert(0, (family, sockaddr))
+            return await asyncio.open_connection(sock=sock)
+        raise last_error or OSError(f"No addresses for {peer}")
+
+    async def _resolve_peer(self, peer: str) -> List[Tuple[int, tuple]]:
+        """Resolve all peer addresses, caching them for resolve_ttl seconds"""
+        cached = self._resolve_cache.get(peer)
+        if cached and time.monotonic() - cached[0] < self.resolve_ttl:
+            return cached[1]
+
+        infos = await asyncio.get_running_loop().getaddrinfo(
+            peer, self.port, type=socket.SOCK_STREAM
+        )
+        addresses = list(dict.fromkeys((info[0], info[4]) for info in infos))
+        self._resolve_cache[peer] = (time.monotonic(), addresses)
+        return addresses
+
+    @staticmethod
+    def _is_connection_usable(entry) -> bool:
+        """Whether a pooled connection is still open in both directions"""
+        reader, writer, _ = entry
+        return not writer.is_closing() and not reader.at_eof()
+
+    def _pool_connection(self, peer: str, reader, writer) -> None:
+        """Store a connection as most recently used, evicting the oldest"""
+        self._conn_pool[peer] = (reader, writer, time.monotonic())
+        self._conn_pool.move_to_end(peer)
+        while len(self._conn_pool) > self.max_pooled_connections:
+            _, (_, old_writer, _) = self._conn_pool.popitem(last=False)
+            old_writer.close()
+
+    async def _evict_connection(self, peer: str, writer) -> None:
+        """Remove a pooled connection and close it"""
+        entry = self._conn_pool.get(peer)
+        if entry and entry[1] is writer:
+            del self._conn_pool[peer]
+        writer.close()
+        try:
             await writer.wait_closed()
+        except Exception:
+            pass
+
+    async def _close_pooled_connections(self) -> None:
+        """Close every pooled connection"""
+        for peer, (_, writer, _) in list(self._conn_pool.items()):
+            await self._evict_connection(peer, writer)
+
+    async def _reap_idle_connections(self) -> None:
+        """Close pooled connections that have been idle too long"""
+        while self.is_running:
+            cutoff = time.monotonic() - self.conn_idle_timeout
+            for peer, (_, writer, last_used) in list(self._conn_pool.items()):
+                if last_used < cutoff:
+                    await self._evict_connection(peer, writer)
+
+            await asyncio.sleep(30)
 
     async def _send_message(self, conn, data: bytes) -> None:
         """Send message with length prefix"""
         reader, writer = conn
-        # Send length prefix
-        writer.write(len(data).to_bytes(4, 'big'))
-        writer.write(data)
+        # Send length prefix and payload as a single write
+        writer.write(len(data).to_bytes(4, 'big') + data)
         await writer.drain()
 
+    def add_peer(self, peer: str) -> None:
+        """Add a peer, or mark an existing one as seen"""
+        state = self.peers.get(peer)
+        if state:
+            state.last_seen = time.time()
+            return
+        self.peers[peer] = PeerState(last_seen=time.time())
+        self.peers_changed.set()
+
+    def remove_peer(self, peer: str) -> None:
+        """Forget a peer"""
+        if self.peers.pop(peer, None) is not None:
+            self.peers_changed.set()
+
     async def _peer_maintenance(self) -> None:
         """Maintain peer list and handle failures"""
         while self.is_running:
             current_time = time.time()
             # Remove stale peers
+            peer_count = len(self.peers)
             self.peers = {
                 peer: state
                 for peer, state in self.peers.items()
                 if current_time - state.last_seen < self.peer_timeout
             }
+            if len(self.peers) != peer_count:
+                self.peers_changed.set()
 
             # Reset failed attempts periodically
             for state in self.peers.values():
@@ -216,6 +441,14 @@ class MeshNetwork:
                 if state.failed_attempts == 0:
                     state.is_active = True
 
+            # Drop expired address resolutions
+            now = time.monotonic()
+            self._resolve_cache = {
+                peer: entry
+                for peer, entry in self._resolve_cache.items()
+                if now - entry[0] < self.resolve_ttl
+            }
+
             await asyncio.sleep(60)
 
     async def _handle_message_buffer(self) -> None:
@@ -239,27 +472,68 @@ class MeshNetwork:
     async def _heartbeat(self) -> None:
         """Send periodic heartbeats to peers"""
         while self.is_running:
-            for peer, state in self.peers.items():
-                if not state.is_active:
-                    continue
-
-                try:
-                    async with self._peer_connection(peer) as conn:
-                        await self._send_message(conn, b"PING")
-                    state.last_seen = time.time()
-                    state.failed_attempts = 0
-                except Exception:
+            active_peers = [
+                (peer, state) for peer, state in self.peers.items()
+                if state.is_active
+            ]
+            pings = [
+                asyncio.create_task(self._ping_peer(peer))
+                for peer, _ in active_peers
+            ]
+            results = await asyncio.gather(*pings, return_exceptions=True)
+
+            for (peer, state), result in zip(active_peers, results):
+                if isinstance(result, Exception):
                     state.failed_attempts += 1
                     if state.failed_attempts >= 3:
                         state.is_active = False
+                else:
+                    state.last_seen = time.time()
+                    state.failed_attempts = 0
 
             await asyncio.sleep(30)  # Heartbeat every 30 seconds
 
+    async def _dht_refresh(self) -> None:
+        """Re-bootstrap the DHT periodically when the routing table runs thin"""
+        while self.is_running:
+            await asyncio.sleep(self.dht_refresh_interval)
+            if not self.is_running:
+                break
+
+            # Skip the re-bootstrap while the routing table is healthy; our
+            # own node doesn't count as a contact
+            own_id = self.dht.node.id
+            contacts = sum(
+                1 for bucket in self.dht.protocol.router.buckets
+                for node in bucket.get_nodes() if node.id != own_id
+            )
+            if contacts >= self.dht.ksize:
+                continue
+
+            nodes = self._bootstrap_candidates()
+            if not nodes:
+                continue
+            try:
+                await self.dht.bootstrap(nodes)
+                self.logger.info(f"🔄 DHT re-bootstrapped from {len(nodes)} node(s)")
+            except Exception as e:
+                self.logger.warning(f"⚠️ DHT refresh failed: {str(e)}")
+
+    def _bootstrap_candidates(self) -> List[Tuple[str, int]]:
+        """Known external DHT nodes: routing table neighbours plus resolved peers"""
+        own = {('127.0.0.1', self.port), ('0.0.0.0', self.port)}
+        # The DHT listens on IPv4 only
+        nodes = self.dht.bootstrappable_neighbors() + [
+            (sockaddr[0], self.port)
+            for _, addresses in self._resolve_cache.values()
+            for family, sockaddr in addresses if family == socket.AF_INET
+        ]
+        return [node for node in dict.fromkeys(nodes) if node not in own]
+
     def _compress_message(self, message: str) -> bytes:
         """Compress message using zstd with error handling"""
         try:
-            compressor = zstd.ZstdCompressor(level=3)  # Balanced compression
-            return compressor.compress(message.encode())
+            return self._zstd_c.compress(message.encode())
         except Exception as e:
             self.logger.error(f"Compression failed: {str(e)}")
             # Fallback to uncompressed
@@ -268,8 +542,7 @@ class MeshNetwork:
     def _decompress_message(self, data: bytes) -> str:
         """Decompress message with error handling"""
         try:
-            decompressor = zstd.ZstdDecompressor()
-            return decompressor.decompress(data).decode()
+            return self._zstd_d.decompress(data).decode()
         except Exception as e:
             self.logger.error(f"Decompression failed: {str(e)}")
             # Try to return as-is if decompression fails
@@ -280,10 +553,15 @@ class MeshNetwork:
             await self._send_message(conn, data)
             self.logger.info(f"Message sent to {peer}") #Added logging
 
+    async def _ping_peer(self, peer: str):
+        """Send a heartbeat to a single peer"""
+        async with self._peer_connection(peer) as conn:
+            await self._send_message(conn, b"PING")
+
     async def _verify_port_available(self, port: int) -> bool:
         """Verify if a port is available"""
         try:
-            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            sock = _make_socket()
             sock.bind(('0.0.0.0', port))
             sock.close()
             return True
@@ -292,12 +570,21 @@ class MeshNetwork:
 
     async def _wait_for_port_active(self, port: int, timeout: int = 30) -> bool:
         """Wait for port to become active"""
+        key = ('127.0.0.1', port)
+        cached = self._hc_cache.get(key)
+        if cached and time.monotonic() - cached[0] < self._hc_ttl:
+            return cached[1]
+
         end_time = time.time() + timeout
         while time.time() < end_time:
             try:
-                sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-                sock.connect(('127.0.0.1', port))
-                sock.close()
+                sock = _make_socket()
+                sock.settimeout(1.0)  # Bound probe cost
+                try:
+                    sock.connect(key)
+                finally:
+                    sock.close()
+                self._hc_cache[key] = (time.monotonic(), True)
                 return True
             except:
                 await asyncio.sleep(1)
@@ -1,6 +1,6 @@
 import os
-import subprocess
 import asyncio
+import random
 import socket
 import socks
 from typing import Optional
@@ -11,11 +11,13 @@ import stat
 
 class TorManager:
     def __init__(self):
-        self.tor_process: Optional[subprocess.Popen] = None
+        self.tor_process: Optional[asyncio.subprocess.Process] = None
+        self._stderr_task: Optional[asyncio.Task] = None
         self.onion_address: Optional[str] = None
         self.socks_port = 9052
         self.control_port = 9053
         self.base_dir = self._get_base_dir()
+        self._tor_path: Optional[str] = None
 
     def _get_base_dir(self) -> str:
         """Get the portable base directory for Tor files"""
@@ -35,6 +37,10 @@ class TorManager:
 
     def _get_tor_path(self) -> str:
         """Get platform-specific Tor binary path with fallbacks"""
+        # Reuse the previous lookup while the binary is still there
+        if self._tor_path and os.access(self._tor_path, os.X_OK):
+            return self._tor_path
+
         if platform.system() == 'Windows':
             tor_names = ['tor.exe']
         else:
@@ -52,10 +58,12 @@ class TorManager:
         if os.environ.get('PATH'):
             search_paths.extend(os.environ['PATH'].split(os.pathsep))
 
-        for path in search_paths:
+        # Skip PATH entries that duplicate the well-known locations
+        for path in dict.fromkeys(search_paths):
             for name in tor_names:
                 tor_path = os.path.join(path, name)
                 if os.path.exists(tor_path) and os.access(tor_path, os.X_OK):
+                    self._tor_path = tor_path
                     return tor_path
 
         raise FileNotFoundError(
@@ -99,48 +107,77 @@ NewCircuitPeriod 300
         # Start Tor process with retries
         max_retries = 3
         retry_delay = 2
+        max_retry_delay = 60
 
         for attempt in range(max_retries):
             try:
                 tor_path = self._get_tor_path()
                 print(f"Starting Tor from: {tor_path}")
 
-                self.tor_process = subprocess.Popen(
-                    [tor_path, "-f", torrc_path],
-                    stdout=subprocess.PIPE,
-                    stderr=subprocess.PIPE
+                self.tor_process = await asyncio.create_subprocess_exec(
+                    tor_path, "-f", torrc_path,
+                    # Tor logs to stdout and nothing reads it; a full pipe
+                    # would block Tor mid-bootstrap
+                    stdout=asyncio.subprocess.DEVNULL,
+                    stderr=asyncio.subprocess.PIPE
                 )
 
                 # Wait for Tor to start and verify it's running
                 if await self._wait_for_tor():
                     print(f"Tor started successfully on attempt {attempt + 1}")
                     return
+                raise Exception("Timed out waiting for Tor to start")
 
             except Exception as e:
                 print(f"Tor start attempt {attempt + 1} failed: {str(e)}")
-                if self.tor_process:
+                if self.tor_process and self.tor_process.returncode is None:
                     self.tor_process.terminate()
                     await asyncio.sleep(1)
 
                 if attempt < max_retries - 1:
-                    await asyncio.sleep(retry_delay)
+                    # Exponential backoff with +/-25% jitter
+                    delay = min(max_retry_delay, retry_delay * (2 ** attempt))
+                    await asyncio.sleep(delay * random.uniform(0.75, 1.25))
                 else:
                     raise Exception(f"Failed to start Tor after {max_retries} attempts")
 
-    async def _wait_for_tor(self) -> bool:
-        """Wait for Tor to start with improved verification"""
+    async def _wait_for_tor(self, timeout: float = 30) -> bool:
+        """Wait for Tor to start, failing fast if the process dies"""
+        ready = asyncio.create_task(self._poll_tor_ready())
+        exited = asyncio.create_task(self.tor_process.wait())
+        try:
+            done, _ = await asyncio.wait(
+                {ready, exited},
+                timeout=timeout,
+                return_when=asyncio.FIRST_COMPLETED
+            )
+        finally:
+            for task in (ready, exited):
+                if not task.done():
+                    task.cancel()
+
+        # Check if process is still running
+        if exited in done:
+            if self.tor_process.stderr:
+                stderr = (await self.tor_process.stderr.read()).decode(errors='replace')
+                raise Exception(f"Tor process died: {stderr}")
+            raise Exception("Tor process died unexpectedly")
+
+        if ready in done:
+            # Keep stderr drained so the pipe can't fill while Tor runs
+            self._stderr_task = asyncio.create_task(self._drain_stderr())
+            return True
+
+        return False
+
+    async def _poll_tor_ready(self, interval: float = 0.1) -> None:
+        """Return once the onion hostname exists and SOCKS is listening"""
         hostname_file = os.path.join(
             self.base_dir, "hidden_service", "hostname"
         )
+        loop = asyncio.get_running_loop()
 
-        for _ in range(30):  # Wait up to 30 seconds
-            # Check if process is still running
-            if self.tor_process and self.tor_process.poll() is not None:
-                if self.tor_process.stderr:
-                    stderr = self.tor_process.stderr.read().decode()
-                    raise Exception(f"Tor process died: {stderr}")
-                raise Exception("Tor process died unexpectedly")
-
+        while True:
             # Check for hostname file
             if os.path.exists(hostname_file):
                 try:
@@ -149,24 +186,35 @@ NewCircuitPeriod 300
 
                     # Verify SOCKS port is listening
                     sock = socket.socket()
+                    sock.setblocking(False)
                     try:
-                        sock.connect(("127.0.0.1", self.socks_port))
+                        await loop.sock_connect(sock, ("127.0.0.1", self.socks_port))
+                        return
+                    finally:
                         sock.close()
-                        return True
-                    except:
-                        pass
-                except:
+                except OSError:
                     pass
 
-            await asyncio.sleep(1)
+            await asyncio.sleep(interval)
 
-        return False
+    async def _drain_stderr(self):
+        """Forward Tor's stderr output until the process exits"""
+        while self.tor_process and self.tor_process.stderr:
+            line = await self.tor_process.stderr.readline()
+            if not line:
+                break
+            print(f"Tor: {line.decode(errors='replace').rstrip()}")
 
     async def stop(self):
         """Stop Tor with graceful shutdown"""
+        if self._stderr_task:
+            self._stderr_task.cancel()
+            self._stderr_task = None
+
         if self.tor_process:
             try:
-                self.tor_process.terminate()
+                if self.tor_process.returncode is None:
+                    self.tor_process.terminate()
                 try:
                     await asyncio.wait_for(
                         asyncio.create_task(self.tor_process.wait()),
@@ -185,12 +233,22 @@ NewCircuitPeriod 300
                         # Securely delete sensitive files
                         for root, dirs, files in os.walk(self.base_dir):
                             for f in files:
-                                path = os.path.join(root, f)
-                                with open(path, 'wb') as fd:
-                                    fd.write(os.urandom(os.path.getsize(path)))
+                                self._overwrite_file(os.path.join(root, f))
                         # Remove directory tree
                         shutil.rmtree(self.base_dir)
                     except:
                         pass
             except:
                 pass  # Ensure cleanup doesn't raise errors
+
+    def _overwrite_file(self, path: str, chunk_size: int = 1 << 20):
+        """Overwrite a file in place with zeros, one reused chunk at a time"""
+        fd = os.open(path, os.O_WRONLY)
+        try:
+            remaining = os.fstat(fd).st_size
+            zeros = memoryview(bytes(min(remaining, chunk_size)))
+            while remaining > 0:
+                remaining -= os.write(fd, zeros[:min(remaining, chunk_size)])
+            os.fsync(fd)
+        finally:
+            os.close(fd)
@@ -2,11 +2,16 @@ from pyspx.shake_256f import generate_keypair, sign, verify
 import hashlib
 from typing import Tuple, Optional
 import os
+import threading
 
 class CryptoManager:
     def __init__(self):
         self.signing_key: Optional[bytes] = None
         self.verify_key: Optional[bytes] = None
+        # Nonces are sliced from a pooled urandom buffer to save syscalls
+        self._nonce_pool = bytearray()
+        self._nonce_off = 0
+        self._nonce_lock = threading.Lock()
         
     def generate_keys(self) -> Tuple[bytes, bytes]:
         """Generate new signing keypair"""
@@ -32,6 +37,19 @@ class CryptoManager:
         """Create SHA-256 hash of data"""
         return hashlib.sha256(data).hexdigest()
         
+    def hash_raw(self, data: bytes) -> bytes:
+        """Create raw 32-byte SHA-256 digest of data (for use as keys)"""
+        return hashlib.sha256(data).digest()
+        
     def generate_nonce(self) -> bytes:
         """Generate a random nonce"""
-        return os.urandom(32)
+        with self._nonce_lock:
+            if len(self._nonce_pool) - self._nonce_off < 32:
+                self._nonce_pool = bytearray(os.urandom(4096))
+                self._nonce_off = 0
+            start = self._nonce_off
+            nonce = bytes(self._nonce_pool[start:start + 32])
+            # Don't keep handed-out nonces around in the pool
+            self._nonce_pool[start:start + 32] = bytes(32)
+            self._nonce_off += 32
+            return nonce
@@ -1,36 +1,133 @@
 
-import nacl.bindings
 import ctypes
+import ctypes.util
+import mmap
 import platform
+from typing import Dict, Optional, Tuple, Union
+
+ARENA_SIZE = 1 << 20
+
+def _load_libc():
+    """Load the C library once, with mlock/munlock prototyped"""
+    if platform.system() == 'Windows':
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        libc.mlock.argtypes = [ctypes.c_void_p, ctypes.c_size_t]
+        libc.mlock.restype = ctypes.c_int
+        libc.munlock.argtypes = [ctypes.c_void_p, ctypes.c_size_t]
+        libc.munlock.restype = ctypes.c_int
+        return libc
+    except (OSError, AttributeError):
+        return None
+
+_libc = _load_libc()
+
+def _load_zeroize():
+    """Pick the best available non-elidable zeroing routine"""
+    # glibc >= 2.25, musl and the BSDs provide explicit_bzero
+    bzero = getattr(_libc, 'explicit_bzero', None) if _libc is not None else None
+    if bzero is not None:
+        bzero.argtypes = [ctypes.c_void_p, ctypes.c_size_t]
+        bzero.restype = None
+        return bzero
+
+    try:
+        libcrypto = ctypes.CDLL(ctypes.util.find_library('crypto') or 'libcrypto.so')
+        cleanse = libcrypto.OPENSSL_cleanse
+        cleanse.argtypes = [ctypes.c_void_p, ctypes.c_size_t]
+        cleanse.restype = None
+        return cleanse
+    except (OSError, AttributeError):
+        pass
+
+    # A foreign memset call can't be optimised away from Python either
+    return lambda addr, size: ctypes.memset(addr, 0, size)
+
+_zeroize = _load_zeroize()
 
 class SecureMemory:
     def __init__(self):
         self.protected_blocks = []
+        # Page-aligned arena locked once; small secrets are bump-allocated
+        # from it instead of each paying for its own mlock'd page
+        self._arena = self._create_arena()
+        self._arena_off = 0
+        self._arena_blocks: Dict[int, Tuple[int, int]] = {}
         
-    def protect_memory(self, data: bytes) -> bytearray:
+    def _create_arena(self):
+        """Map and lock the arena, or return None if locking is unavailable"""
+        if _libc is None:
+            return None
+        try:
+            arena = mmap.mmap(-1, ARENA_SIZE)
+            addr = ctypes.addressof(ctypes.c_char.from_buffer(arena))
+            if _libc.mlock(addr, ARENA_SIZE) != 0:
+                arena.close()
+                return None
+            return arena
+        except:
+            return None
+        
+    def protect_memory(self, data: bytes) -> Union[bytearray, memoryview]:
         """Protect memory block from being swapped to disk"""
+        size = len(data)
+        if self._arena is not None and 0 < size <= ARENA_SIZE - self._arena_off:
+            off = self._arena_off
+            self._arena[off:off + size] = data
+            self._arena_off += size
+            protected = memoryview(self._arena)[off:off + size]
+            self._arena_blocks[id(protected)] = (off, size)
+            self.protected_blocks.append(protected)
+            return protected
+        
+        # Arena exhausted or unavailable: lock a standalone block
         protected = bytearray(data)
         self.protected_blocks.append(protected)
         
-        if platform.system() != 'Windows':
+        if _libc is not None and protected:
             try:
                 # Lock memory to prevent swapping
-                libc = ctypes.CDLL('libc.so.6')
-                libc.mlock(
-                    ctypes.c_void_p(protected.__array_interface__['data'][0]),
-                    len(protected)
-                )
+                buf = (ctypes.c_char * len(protected)).from_buffer(protected)
+                _libc.mlock(ctypes.addressof(buf), len(protected))
             except:
                 pass
                 
         return protected
         
-    def secure_wipe(self, data: bytearray):
+    def secure_wipe(self, data: Union[bytearray, memoryview]):
         """Securely wipe memory block"""
-        if data in self.protected_blocks:
-            self.protected_blocks.remove(data)
+        for i, block in enumerate(self.protected_blocks):
+            if block is data:
+                del self.protected_blocks[i]
+                break
             
-        nacl.bindings.sodium_memzero(data)
+        self.fast_wipe(data)
+        
+        # Give arena space back when possible
+        span = self._arena_blocks.pop(id(data), None)
+        if span is not None:
+            data.release()
+            if not self._arena_blocks:
+                self._arena_off = 0
+            elif span[0] + span[1] == self._arena_off:
+                self._arena_off = span[0]
+        elif _libc is not None and len(data):
+            # Standalone blocks were locked individually; release the pages
+            try:
+                buf = (ctypes.c_char * len(data)).from_buffer(data)
+                _libc.munlock(ctypes.addressof(buf), len(data))
+                del buf
+            except:
+                pass
+        
+    def fast_wipe(self, data: Union[bytearray, memoryview], length: Optional[int] = None):
+        """Zero the first length bytes (default all) of a writable buffer"""
+        size = len(data) if length is None else min(length, len(data))
+        if size:
+            buf = (ctypes.c_char * size).from_buffer(data)
+            _zeroize(ctypes.addressof(buf), size)
+            del buf
         
     def wipe_all(self):
         """Wipe all protected memory blocks"""
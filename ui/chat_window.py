@@ -1,28 +1,68 @@
 import tkinter as tk
-from tkinter import scrolledtext, messagebox
+from tkinter import scrolledtext
 import asyncio
-from typing import Callable, Optional
+import collections
+import concurrent.futures
+import logging
+from typing import Callable, Deque, List, Optional
 from network.mesh import MeshNetwork
 from network.tor_manager import TorManager
 from security.crypto import CryptoManager
 from security.memory import SecureMemory
 
 class ChatWindow:
+    __slots__ = (
+        'mesh_network', 'tor_manager', 'crypto', 'secure_memory', 'loop',
+        'root', 'is_running', 'chat_area', 'msg_entry', '_msg_var', 'peer_label',
+        '_onion_text', '_pending', '_tasks', '_send_task', '_plaintext', '_plaintext_len',
+        '_line_sizes', '_open_line', '_last_peer_count', '_send_q', 'logger'
+    )
+
+    STATUS_TEMPLATE = (
+        "\nNetwork Status:\n"
+        "--------------\n"
+        "Tor: {}\n"
+        "Onion: {}\n"
+        "Active Peers: {}\n"
+        "Buffered Messages: {}\n"
+    )
+    # Oldest lines are dropped beyond this to bound widget memory
+    MAX_LINES = 5000
+
     def __init__(
         self,
         mesh_network: MeshNetwork,
         tor_manager: TorManager,
         crypto: CryptoManager,
-        secure_memory: SecureMemory
+        secure_memory: SecureMemory,
+        loop: asyncio.AbstractEventLoop
     ):
         self.mesh_network = mesh_network
         self.tor_manager = tor_manager
         self.crypto = crypto
         self.secure_memory = secure_memory
+        # Event loop running the mesh network on a background thread
+        self.loop = loop
         self.root: Optional[tk.Tk] = None
         self.is_running = True
+        # Chat text waiting to be inserted by the Tk thread in one batch
+        self._pending: Deque[str] = collections.deque()
+        self._last_peer_count = -1
+        # Background coroutines owned by the window, cancelled on close
+        self._tasks: List[concurrent.futures.Future] = []
+        self._send_task: Optional[concurrent.futures.Future] = None
+        # Outgoing messages, drained by a single worker on the loop thread
+        self._send_q: "asyncio.Queue[str]" = asyncio.Queue(maxsize=64)
+        self.logger = logging.getLogger('ChatWindow')
+        # Locked copy of the transcript, appended as text is inserted so
+        # clearing never has to read the widget back
+        self._plaintext = self.secure_memory.protect_memory(bytes(65536))
+        self._plaintext_len = 0
+        # Encoded size of each complete transcript line, for MAX_LINES trimming
+        self._line_sizes: Deque[int] = collections.deque()
+        self._open_line = 0
 
-    async def run(self):
+    def run(self):
         self.root = tk.Tk()
         self.root.title("Secure Mesh Chat")
         self.root.geometry("600x800")
@@ -31,26 +71,29 @@ class ChatWindow:
         status_frame = tk.Frame(self.root)
         status_frame.pack(fill=tk.X, padx=5, pady=5)
 
-        # Onion address
+        # Onion address (fixed for the lifetime of the hidden service)
+        addr = self.tor_manager.onion_address
+        self._onion_text = f"Onion: {addr}"
         onion_label = tk.Label(
             status_frame,
-            text=f"Onion: {self.tor_manager.onion_address}",
+            text=self._onion_text,
             fg="green"
         )
         onion_label.pack(side=tk.LEFT)
 
         # Peer count
-        peer_label = tk.Label(
+        self.peer_label = tk.Label(
             status_frame,
             text=f"Peers: {len(self.mesh_network.peers)}"
         )
-        peer_label.pack(side=tk.RIGHT)
+        self.peer_label.pack(side=tk.RIGHT)
 
         # Chat area
         self.chat_area = scrolledtext.ScrolledText(
             self.root,
             wrap=tk.WORD,
-            height=30
+            height=30,
+            state=tk.DISABLED  # Read-only; text is added via _append_chat
         )
         self.chat_area.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
 
@@ -58,7 +101,9 @@ class ChatWindow:
         input_frame = tk.Frame(self.root)
         input_frame.pack(fill=tk.X, padx=5, pady=5)
 
-        self.msg_entry = tk.Entry(input_frame)
+        # Read through the variable to skip a widget round-trip on send
+        self._msg_var = tk.StringVar(self.root)
+        self.msg_entry = tk.Entry(input_frame, textvariable=self._msg_var)
         self.msg_entry.pack(side=tk.LEFT, fill=tk.X, expand=True)
 
         send_btn = tk.Button(
@@ -87,73 +132,252 @@ class ChatWindow:
         # Set up close handler
         self.root.protocol("WM_DELETE_WINDOW", self._on_close)
 
-        # Start message receiver
-        asyncio.create_task(self._receive_messages())
+        self._tasks = [
+            # Start message receiver
+            asyncio.run_coroutine_threadsafe(self._receive_messages(), self.loop),
+            # Start periodic UI updates
+            asyncio.run_coroutine_threadsafe(self._update_ui(), self.loop)
+        ]
+        # Start outgoing message worker; drained rather than cancelled on close
+        self._send_task = asyncio.run_coroutine_threadsafe(self._send_worker(), self.loop)
 
-        # Start periodic UI updates
-        asyncio.create_task(self._update_ui())
+        # Start batched chat area updates
+        self.root.after(33, self._flush_pending)
 
-        while self.is_running:
-            try:
-                self.root.update()
-                await asyncio.sleep(0.1)
-            except tk.TclError:  # Window was closed
-                break
+        self.root.mainloop()
 
     def _send_message(self):
-        msg = self.msg_entry.get()
+        msg = self._msg_var.get()
         if msg:
-            asyncio.create_task(self.mesh_network.broadcast_message(msg))
-            self.chat_area.insert(tk.END, f"You: {msg}\n")
-            self.msg_entry.delete(0, tk.END)
+            if self._send_q.full():
+                # Back-pressure: keep the text in the entry so it can be resent
+                self.root.bell()
+                return
+            self.loop.call_soon_threadsafe(self._enqueue_send, msg)
+            # Shown with the next batched flush
+            self._pending.append("You: ")
+            self._pending.append(msg)
+            self._pending.append("\n")
+            self._msg_var.set('')
+
+    def _enqueue_send(self, msg: str):
+        """Queue a message for the send worker (runs on the loop thread)"""
+        try:
+            self._send_q.put_nowait(msg)
+        except asyncio.QueueFull:
+            self.logger.warning("Send queue full, message dropped")
+
+    async def _send_worker(self):
+        # Runs until cancelled so messages queued before close still go out
+        while True:
+            msg = await self._send_q.get()
+            try:
+                await self.mesh_network.broadcast_message(msg)
+            except Exception as e:
+                self.logger.error(f"Broadcast failed: {str(e)}")
+            finally:
+                self._send_q.task_done()
+
+    async def _drain_send_queue(self, timeout: float):
+        """Wait for queued and in-flight sends to finish, up to timeout"""
+        try:
+            await asyncio.wait_for(self._send_q.join(), timeout)
+        except asyncio.TimeoutError:
+            self.logger.warning(
+                f"Closing with {self._send_q.qsize()} message(s) still queued"
+            )
+
+    def _confirm(self, title: str, message: str, callback: Callable[[bool], None]):
+        """Ask a yes/no question without entering a nested modal loop"""
+        top = tk.Toplevel(self.root)
+        top.title(title)
+        top.transient(self.root)
+        top.resizable(False, False)
+
+        def answer(value: bool):
+            top.destroy()
+            callback(value)
+
+        top.protocol("WM_DELETE_WINDOW", lambda: answer(False))
+        tk.Label(top, text=message, padx=20, pady=10).pack()
+        buttons = tk.Frame(top)
+        buttons.pack(pady=(0, 10))
+        tk.Button(buttons, text="Yes", width=8, command=lambda: answer(True)).pack(side=tk.LEFT, padx=5)
+        tk.Button(buttons, text="No", width=8, command=lambda: answer(False)).pack(side=tk.LEFT, padx=5)
+
+    def _notify(self, title: str, message: str):
+        """Show an informational window without blocking"""
+        top = tk.Toplevel(self.root)
+        top.title(title)
+        top.transient(self.root)
+        tk.Label(top, text=message, justify=tk.LEFT, padx=20, pady=10).pack()
+        tk.Button(top, text="OK", width=8, command=top.destroy).pack(pady=(0, 10))
 
     def _clear_chat(self):
-        if messagebox.askyesno("Confirm", "Clear all messages?"):
-            # Get current content before clearing
-            content = self.chat_area.get("1.0", tk.END).encode()
+        self._confirm("Confirm", "Clear all messages?", self._do_clear)
 
+    def _do_clear(self, confirmed: bool):
+        if confirmed:
             # Clear the chat area first
+            self.chat_area.configure(state=tk.NORMAL)
             self.chat_area.delete("1.0", tk.END)
+            self.chat_area.configure(state=tk.DISABLED)
 
             # Then securely wipe the content
-            protected = self.secure_memory.protect_memory(content)
-            self.secure_memory.secure_wipe(protected)
+            self._wipe_plaintext(self._plaintext_len)
+
+    def _wipe_plaintext(self, n: int):
+        """Zero the first n bytes of the transcript buffer and reset it"""
+        self.secure_memory.fast_wipe(self._plaintext, n)
+        self._plaintext_len = 0
+        self._line_sizes.clear()
+        self._open_line = 0
+
+    def _append_plaintext(self, n: int, chunk: bytes) -> int:
+        """Copy chunk into the transcript buffer at offset n, return the new end"""
+        end = n + len(chunk)
+        if end > len(self._plaintext):
+            # Grow the pooled buffer; the old one is wiped and released
+            grown = self.secure_memory.protect_memory(bytes(end * 2))
+            grown[:n] = memoryview(self._plaintext)[:n]
+            self.secure_memory.secure_wipe(self._plaintext)
+            self._plaintext = grown
+        self._plaintext[n:end] = chunk
+        return end
+
+    def _record_lines(self, data: bytes):
+        """Track the encoded size of each line in data"""
+        start = 0
+        nl = data.find(b'\n')
+        while nl >= 0:
+            self._line_sizes.append(self._open_line + nl + 1 - start)
+            self._open_line = 0
+            start = nl + 1
+            nl = data.find(b'\n', start)
+        self._open_line += len(data) - start
+
+    def _drop_plaintext_lines(self, count: int):
+        """Remove the oldest count lines from the transcript buffer"""
+        size = sum(self._line_sizes.popleft() for _ in range(count))
+        n = self._plaintext_len
+        buf = memoryview(self._plaintext)
+        buf[:n - size] = buf[size:n]
+        buf.release()
+        # Zero the now unused tail
+        tail = memoryview(self._plaintext)[n - size:n]
+        self.secure_memory.fast_wipe(tail)
+        tail.release()
+        self._plaintext_len = n - size
 
     def _show_status(self):
-        status = f"""
-Network Status:
---------------
-Tor: {'Running' if self.tor_manager.tor_process else 'Stopped'}
-Onion: {self.tor_manager.onion_address}
-Active Peers: {len(self.mesh_network.peers)}
-Buffered Messages: {len(self.mesh_network.message_buffer)}
-"""
-        messagebox.showinfo("Status", status)
+        status = self.STATUS_TEMPLATE.format(
+            'Running' if self.tor_manager.tor_process else 'Stopped',
+            self.tor_manager.onion_address,
+            len(self.mesh_network.peers),
+            len(self.mesh_network.message_buffer)
+        )
+        self._notify("Status", status)
 
     def _on_close(self):
-        if messagebox.askyesno("Quit", "Are you sure you want to quit?"):
+        self._confirm("Quit", "Are you sure you want to quit?", self._do_close)
+
+    def _do_close(self, confirmed: bool):
+        if confirmed:
             self.is_running = False  # Stop the main loop
+
+            # Stop background coroutines now instead of at their next wakeup
+            for task in self._tasks:
+                task.cancel()
+            concurrent.futures.wait(self._tasks, timeout=1)
+
+            # Let messages already shown as sent go out before stopping the
+            # worker; scheduled after any pending _enqueue_send callbacks
+            if self._send_task:
+                try:
+                    asyncio.run_coroutine_threadsafe(
+                        self._drain_send_queue(5), self.loop
+                    ).result(timeout=6)
+                except Exception as e:
+                    self.logger.error(f"Send queue drain failed: {str(e)}")
+                self._send_task.cancel()
+                concurrent.futures.wait([self._send_task], timeout=1)
+
+            # Gather all remaining plaintext behind the transcript and wipe
+            # it in a single pass
+            n = self._append_plaintext(
+                self._plaintext_len,
+                self._msg_var.get().encode('utf-8', 'surrogateescape')
+            )
+            while self._pending:
+                n = self._append_plaintext(
+                    n, self._pending.popleft().encode('utf-8', 'surrogateescape')
+                )
+            self.chat_area.configure(state=tk.NORMAL)
+            self.chat_area.delete("1.0", tk.END)
+            self._msg_var.set('')
+            self._wipe_plaintext(n)
+
             if self.root:
                 self.root.quit()  # Stop Tkinter
                 self.root.destroy()  # Destroy the window
 
     async def _receive_messages(self):
         while self.is_running:
-            # Process received messages
-            await asyncio.sleep(0.1)
+            # Wait for the next message; the Tk thread inserts them in batches
+            msg = await self.mesh_network.inbox.get()
+            self._pending.append(f"{msg}\n")
+
+    def _flush_pending(self):
+        """Insert queued chat text with a single widget call (~30 Hz)"""
+        if not self.is_running:
+            return
+
+        if self._pending:
+            # Pop only what is queued now; the loop thread may keep appending
+            batch = [self._pending.popleft() for _ in range(len(self._pending))]
+            self._append_chat("".join(batch))
+
+        self.root.after(33, self._flush_pending)
+
+    def _append_chat(self, text: str):
+        """Append text to the read-only chat area, keeping at most MAX_LINES"""
+        data = text.encode('utf-8', 'surrogateescape')
+        self._plaintext_len = self._append_plaintext(self._plaintext_len, data)
+        self._record_lines(data)
+
+        self.chat_area.configure(state=tk.NORMAL)
+        self.chat_area.insert(tk.END, text)
+        end_line = int(self.chat_area.index('end-1c').split('.')[0])
+        if end_line > self.MAX_LINES:
+            self.chat_area.delete('1.0', f'{end_line - self.MAX_LINES}.0')
+            self._drop_plaintext_lines(end_line - self.MAX_LINES - 1)
+        self.chat_area.configure(state=tk.DISABLED)
+        self.chat_area.see(tk.END)
 
     async def _update_ui(self):
         while self.is_running:
             if not self.root:
                 break
 
-            try:
-                # Update peer count
-                peer_count = len(self.mesh_network.peers)
-                self.root.nametowidget(".!frame.!label2").configure(
-                    text=f"Peers: {peer_count}"
-                )
-            except tk.TclError:  # Window was closed
-                break
+            # Sleep until the mesh reports a peer-list change
+            await self.mesh_network.peers_changed.wait()
+            self.mesh_network.peers_changed.clear()
+
+            # Only touch Tk when the count actually changed
+            peer_count = len(self.mesh_network.peers)
+            if peer_count != self._last_peer_count:
+                try:
+                    # Widgets may only be touched from the Tk thread
+                    self.root.after(0, self._set_peer_count, peer_count)
+                except (tk.TclError, RuntimeError):  # Window was closed
+                    break
+                self._last_peer_count = peer_count
+
+            # Coalesce bursts of changes into at most 5 updates per second
+            await asyncio.sleep(0.2)
 
-            await asyncio.sleep(1)
+    def _set_peer_count(self, peer_count: int):
+        try:
+            self.peer_label.configure(text=f"Peers: {peer_count}")
+        except tk.TclError:  # Window was closed
+            pass